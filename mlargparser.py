@@ -6,66 +6,155 @@
 # Standard Library
 import argparse
 import sys
-import shutil
-import os
 import ast
 import inspect
 
 from io import StringIO
-from types import GenericAlias
+from itertools import chain
+from types import FunctionType, GenericAlias, MethodType
 
 # string to use for undocumented commands/arguments
 STR_UNDOCUMENTED = "FIXME: UNDOCUMENTED"
 
 # list of types that can be safely converted from string by the ast.literal_eval method
-AST_TYPES = [list, tuple, dict, set]
+AST_TYPES = frozenset({list, tuple, dict, set})
 
-# Set this environment variable to help the argparse formatter wrap the lines
-os.environ['COLUMNS'] = str(shutil.get_terminal_size().columns)
+# mapping of builtin type names to types (for resolving string annotations, e.g. from "from __future__ import annotations")
+_BUILTIN_TYPES = {t.__name__: t for t in (str, int, float, bool, bytes, list, tuple, dict, set)}
+
+# sentinel used by inspect for missing annotations/defaults
+_EMPTY = inspect.Parameter.empty
+
+# translation table for turning argument names into option names (underscores in option names are uncool)
+_UNDERSCORE_TO_DASH = str.maketrans("_", "-")
+
+# cache of type annotations to their resolved (parser, is_list) pairs (populated by _resolve_type)
+_TYPE_CACHE = dict()
+
+# cache of command functions to their signatures (populated by _get_signature)
+_SIGNATURE_CACHE = dict()
+
+# cache of command functions/classes to their cleaned-up docstrings (populated by _get_doc)
+_DOC_CACHE = dict()
+
+# cache of (command function, parameter name, description) to CmdArg objects (populated by _get_cmd_arg)
+_CMD_ARG_CACHE = dict()
+
+
+def _resolve_type(annotation):
+    """ Determine the string-conversion callable for a type annotation and whether it's a list alias (e.g. list[str]) """
+    # fast path for the most common scalar types
+    if annotation is str or annotation is int or annotation is float:
+        return annotation, False
+    
+    # un-annotated parameters are treated as strings
+    if annotation is _EMPTY or annotation is None:
+        return str, False
+    
+    try:
+        return _TYPE_CACHE[annotation]
+    except KeyError:
+        pass
+    
+    if type(annotation) is GenericAlias and annotation.__origin__ is list:
+        resolved = (annotation.__args__[0], True)
+    elif annotation in AST_TYPES:
+        resolved = (ast.literal_eval, False)
+    else:
+        resolved = (annotation, False)
+    
+    _TYPE_CACHE[annotation] = resolved
+    return resolved
+
+
+def _callable_key(command_callable):
+    """ Cache key for a command callable, or None if it shouldn't be cached """
+    # bound methods are created per-instance, so key on the function they wrap (noting the binding, since that drops "self")
+    if isinstance(command_callable, MethodType):
+        return (command_callable.__func__, True)
+    
+    # anything else (e.g. callable objects, or partials created per binding) may be unhashable or short-lived
+    if isinstance(command_callable, (FunctionType, type)):
+        return (command_callable, False)
+    
+    return None
+
+
+def _memoize(cache, key, factory):
+    """ Look up a key in one of the module caches, calling the factory to populate it on a miss (or always, if key is None) """
+    if key is None:
+        return factory()
+    
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    
+    value = cache[key] = factory()
+    return value
+
+
+def _get_signature(command_callable):
+    """ Retrieve the signature of a command callable, inspecting each underlying function only once """
+    return _memoize(_SIGNATURE_CACHE, _callable_key(command_callable), lambda: inspect.signature(command_callable))
+
+
+def _get_doc(command_callable):
+    """ Retrieve the docstring of a command callable, cleaning up each underlying function's docstring only once """
+    return _memoize(_DOC_CACHE, _callable_key(command_callable), lambda: inspect.getdoc(command_callable))
 
 
 class CmdArg:
-    name = ""
-    desc = ""
-    type = None
-    required = False
-    action = ""
-    nargs = 1
+    __slots__ = ('name', 'dest', 'long_option', 'short_option', 'desc', 'type', 'required', 'action', 'nargs', 'parser')
     
     def __init__(self, signature, desc):
-        self.name = signature.name
+        self.nargs = 1
+        self.name = self.dest = signature.name
+        
+        # underscores in argument names are uncool, so replace them with dashes
+        self.long_option = "--%s" % self.name.translate(_UNDERSCORE_TO_DASH)
+        self.short_option = "-%s" % self.name[0]
+
         self.type = signature.annotation
-        self.parser = ast.literal_eval if self.type in AST_TYPES else self.type
+        
+        # string annotations naming a builtin type are treated as the type itself
+        if isinstance(self.type, str):
+            self.type = _BUILTIN_TYPES.get(self.type, self.type)
+        
+        self.parser, is_list = _resolve_type(self.type)
         self.desc = desc
-        self.required = False if self.type == bool else (signature.default == inspect.Parameter.empty)
+        self.required = False if self.type is bool else (signature.default is _EMPTY)
 
         # Booleans need special hand-holding
-        if self.type == bool:
+        if self.type is bool:
             if self.name.startswith("no_"):
                 self.action = "store_false"
 
-                if self.desc != STR_UNDOCUMENTED and signature.default == True:
+                # Explicit disable boolean args should reference their enable flag value instead
+                self.dest = self.name[3:]
+
+                if self.desc != STR_UNDOCUMENTED and signature.default is True:
                     self.desc = f"Explicitly do not {self.desc[0].lower()}{self.desc[1:]}"
+            elif signature.default is True:
+                # flags which are enabled by default get a single action which also accepts an explicit disable flag
+                self.action = argparse.BooleanOptionalAction
+                self.desc = f"{self.desc} [default]"
             else:
                 self.action = "store_true"
-
-                if signature.default == True:
-                    self.desc = f"{self.desc} [default]"
-        elif type(self.type) == GenericAlias and typoe(self.type()) == list:
-            self.parser = self.type.__args__[0]
+        elif is_list:
             self.action = "append"
             self.nargs = "+"
         else:
             self.action = "store"
 
-            if signature.default != inspect.Parameter.empty:
+            if signature.default is not _EMPTY:
                 self.desc += f' [default: "{signature.default}"]'
     
     def get_argparse_kwargs(self):
         retval = {
             'help': self.desc,
             'required': self.required,
-            'dest': self.name,
+            'dest': self.dest,
             'action': self.action,
         }
 
@@ -75,13 +164,41 @@ class CmdArg:
         if self.action == "append":
             retval['nargs'] = self.nargs
 
-        # Explicit disable boolean args should reference their enable flag value instead
-        if self.type == bool and self.name.startswith("no_"):
-            retval['dest'] = self.name[3:]
-
         return retval
 
 
+def _get_cmd_arg(command_callable, signature, desc):
+    """ Retrieve the CmdArg for a command parameter, constructing it only once per parameter and description """
+    # parameters are identified by name within their underlying function (defaults may not be hashable)
+    callable_key = _callable_key(command_callable)
+    key = None if callable_key is None else (callable_key, signature.name, desc)
+    return _memoize(_CMD_ARG_CACHE, key, lambda: CmdArg(signature, desc))
+
+
+class _LazyEpilogParser(argparse.ArgumentParser):
+    """ ArgumentParser which only builds its epilog when the help output is actually formatted """
+    
+    def __init__(self, epilog_factory, **kwargs):
+        super().__init__(**kwargs)
+        self.epilog_factory = epilog_factory
+    
+    def format_help(self):
+        if self.epilog is None:
+            self.epilog = self.epilog_factory()
+        
+        return super().format_help()
+
+
+class _Command:
+    """ Entry in the command table (a command's name, callable, and lazily-built argument list) """
+    __slots__ = ('name', 'callable', 'cmd_args')
+    
+    def __init__(self, name, command_callable):
+        self.name = name
+        self.callable = command_callable
+        self.cmd_args = None
+
+
 
 class MLArgParser:
     __doc__ = STR_UNDOCUMENTED
@@ -89,13 +206,19 @@ class MLArgParser:
     # mapping of command arguments to descriptions (initialized in constructor)
     argDesc = None
     
-    # mapping of lower-case commands to method names and attributes (initialized in __init_commands)
+    # mapping of lower-case commands to _Command entries (initialized in __init_commands)
     commands = None
     
-    # list for tracking auto-generated short options (initialized in __get_cmd_parser)
+    # set for tracking auto-generated short options (reset for each parser in __get_cmd_parser)
     short_options = None
     
-    def __init__(self, level=1, parent=None, top=None, noparse=False):
+    # sorted list of unbound command candidates, cached per class (initialized in __init_commands)
+    _command_candidates = None
+    
+    # formatted "available commands" epilog, cached per class (initialized in __get_epilog_str)
+    _epilog = None
+    
+    def __init__(self, level=1, parent=None, top=None, noparse=False, argv=None):
         # indicate how many command-levels deep we are
         self.level = level
         
@@ -105,6 +228,17 @@ class MLArgParser:
         # keep track of our top-level command
         self.top = top if level > 1 else self
         
+        # keep track of the command line being parsed (explicitly-provided arguments, the parent's, or sys.argv)
+        if argv is not None:
+            self.argv = sys.argv[0:1] + list(argv)
+        elif parent is not None:
+            self.argv = parent.argv
+        else:
+            self.argv = sys.argv
+        
+        # the portion of the command line which leads up to this level (used to build usage strings)
+        self.usage_prefix = " ".join(self.argv[0:level])
+        
         if noparse:
             return
         
@@ -124,35 +258,52 @@ class MLArgParser:
         
         self.argDesc = combinedArgDesc
         
-        # create our top-level parser
-        self.parser = argparse.ArgumentParser(
+        # create our top-level parser (the list of commands is only needed if the help output is shown)
+        self.parser = _LazyEpilogParser(
+            self.__get_epilog_str,
             description=inspect.getdoc(self),
-            usage=(("%s " * level) + "<command> [<args>]") % tuple(sys.argv[0:level]),
-            epilog=self.__get_epilog_str(),
+            usage=f"{self.usage_prefix} <command> [<args>]",
             formatter_class=argparse.RawDescriptionHelpFormatter
         )
         
         self.parser.add_argument('command', help='Sub-command to run')
         
-        # parse only the first argument after the current command
-        parsed_command = self.parser.parse_args(sys.argv[level:level + 1]).command.lower()
+        # parse only the first argument after the current command (interned, like the command table's keys)
+        parsed_command = sys.intern(self.parser.parse_args(self.argv[level:level + 1]).command.lower())
         
         # make sure it's a valid command and find the corresponding callable
         command_callable = self.__get_cmd_callable(parsed_command)
         
         # get a dictionary representing the arguments for the command
-        callable_args = self.__parse_cmd_args(command_callable)
+        callable_args = self.__parse_cmd_args(parsed_command)
         
         # invoke the callable for the command with all provided arguments
         command_callable(**callable_args)
     
-    def __parse_cmd_args(self, command_callable):
+    @classmethod
+    def clear_cache(cls):
+        """ Discard cached command tables, signatures, and help text (e.g. after modifying commands at runtime) """
+        _TYPE_CACHE.clear()
+        _SIGNATURE_CACHE.clear()
+        _DOC_CACHE.clear()
+        _CMD_ARG_CACHE.clear()
+        
+        # per-class caches live on the classes themselves, so walk down through every subclass
+        pending = [cls]
+        
+        while pending:
+            klass = pending.pop()
+            klass._command_candidates = None
+            klass._epilog = None
+            pending.extend(klass.__subclasses__())
+    
+    def __parse_cmd_args(self, parsed_command):
         # intercept sub-commands
-        if isinstance(command_callable, type):
+        if isinstance(self.commands[parsed_command].callable, type):
             return {'level': self.level + 1, 'parent': self, 'top': self.top}
         
         # get a parser object for the command function
-        cmd_parser = self.__get_cmd_parser(command_callable)
+        cmd_parser = self.__get_cmd_parser(parsed_command)
         
         # try to extract a list of args for the command
         try:
@@ -161,8 +312,7 @@ class MLArgParser:
             sys.stderr = StringIO()
             
             # Parse the arguments
-            parsed = cmd_parser.parse_args(sys.argv[self.level + 1:])
-            func_args = vars(parsed)
+            parsed = cmd_parser.parse_args(self.argv[self.level + 1:])
         except SystemExit as exit_signal:
             parser_output = sys.stderr.getvalue()
             
@@ -177,108 +327,149 @@ class MLArgParser:
         finally:
             sys.stderr = stderr
         
-        # iterate through the args and remove any that weren't specified
-        for key in list(func_args.keys()):
-            func_args.pop(key) if func_args[key] is None else None
+        # collect the args, leaving out any that weren't specified
+        func_args = {key: value for key, value in vars(parsed).items() if value is not None}
+        
+        # each use of an "append" argument is collected as its own list, so flatten them into one list
+        for arg, _ in self.__get_cmd_args(parsed_command):
+            if arg.action != "append":
+                continue
+            
+            values = func_args.get(arg.name)
+            
+            if values is not None:
+                func_args[arg.name] = list(chain.from_iterable(values))
         
         return func_args
     
     def __get_cmd_callable(self, parsed_command):
-        if parsed_command.startswith("_") or parsed_command not in list(self.commands.keys()):
+        if parsed_command.startswith("_") or parsed_command not in self.commands:
             print(('Unrecognized command: %s' % parsed_command))
             self.parser.print_help()
             exit(1)
         
         # create a parser for the command
-        return self.commands[parsed_command][1]
+        return self.commands[parsed_command].callable
     
     def __init_commands(self):
-        if self.commands:
+        # the command table only needs to be built once (an empty table is still a built table)
+        if self.commands is not None:
             return
         
         self.commands = dict()
+        cls = type(self)
         
-        for attr_name in dir(self):
-            attr = getattr(self, attr_name)
+        # the candidates only depend on the class, so only scan each class once (checking the class's own dict
+        # so that subclasses don't pick up their parent's cache)
+        if cls.__dict__.get("_command_candidates") is None:
+            cls._command_candidates = self.__scan_command_candidates(cls)
+        
+        for attr_name, attr in cls._command_candidates:
+            # bind descriptors (e.g. functions to methods) the same way attribute lookup would
+            if hasattr(type(attr), "__get__"):
+                attr = attr.__get__(self, cls)
             
-            if callable(attr) and not attr_name.startswith("_"):
-                self.commands[attr_name.lower()] = (attr_name, attr)
+            if callable(attr):
+                self.commands[sys.intern(attr_name.lower())] = _Command(attr_name, attr)
+    
+    @staticmethod
+    def __scan_command_candidates(cls):
+        candidates = dict()
+        
+        # walk the class hierarchy directly (rather than dir) so private/dunder attributes are skipped up front
+        for klass in cls.__mro__:
+            # neither the framework itself nor object can contribute commands
+            if klass is MLArgParser or klass is object:
+                continue
+            
+            for attr_name, attr in klass.__dict__.items():
+                # the first definition found in the MRO wins, just like normal attribute lookup
+                if not attr_name.startswith("_") and attr_name not in candidates:
+                    candidates[attr_name] = attr
+        
+        # keep the same (sorted) ordering that dir provided
+        return sorted(candidates.items())
     
     def __get_epilog_str(self):
-        # start with a header
-        epilog = "available commands:\n"
+        cls = type(self)
+        
+        # the epilog only depends on the class's commands and their docstrings, so only build it once per class
+        if cls.__dict__.get("_epilog") is not None:
+            return cls._epilog
         
         # retrieve a list of attributes in the current class (excluding dunders)
         cmd_list = list()
         
         # build a list of all commands with descriptions
-        for (cmd_name, attr) in self.commands.values():
-            desc = inspect.getdoc(attr)
+        for command in self.commands.values():
+            desc = _get_doc(command.callable)
             
             if not desc:
                 desc = STR_UNDOCUMENTED
             
-            cmd_list.append([cmd_name, desc])
+            cmd_list.append((command.name, desc))
         
         # determine the max width for the commands column
-        if len(cmd_list):
-            col_width = max(len(cmd) for cmd in list([x[0] for x in cmd_list])) + 6
-            
-            # format each command row
-            for row in cmd_list:
-                epilog += "  %s\n" % "".join(word.ljust(col_width) for word in row)
+        col_width = max((len(cmd_name) for cmd_name, _ in cmd_list), default=0) + 6
         
-        return epilog + " "
-    
-    def __get_options_for_arg(self, arg):
-        # initialize short options tracker
-        if not self.short_options:
-            self.short_options = list()
+        # start with a header, then format each command row
+        epilog = ["available commands:\n"]
         
-        # underscores in argument names are uncool, so replace them with dashes
-        long_option = "--%s" % arg.replace("_", "-")
+        for cmd_name, desc in cmd_list:
+            epilog.append(f"  {cmd_name.ljust(col_width)}{desc}\n")
         
+        cls._epilog = "".join(epilog) + " "
+        return cls._epilog
+    
+    def __get_options_for_arg(self, arg):
         # try to define a short option if it's not already used
-        short_option = "-%s" % arg[0]
-        
-        if short_option not in self.short_options:
-            self.short_options.append(short_option)
-            return long_option, short_option
+        if arg.short_option not in self.short_options:
+            self.short_options.add(arg.short_option)
+            return arg.long_option, arg.short_option
         else:
-            return long_option,
+            return arg.long_option,
     
-    def __get_arg_properties(self, command_callable):
+    def __build_cmd_args(self, command_callable):
+        cmd_args = list()
+        arg_desc = self.argDesc or dict()
+        
         # Iterate through each parameter in the callable's signature
-        for arg in inspect.signature(command_callable).parameters.values():
+        for arg in _get_signature(command_callable).parameters.values():
             # Determine if we have a description for the parameter, if not use the default text
-            if self.argDesc is None or arg.name not in self.argDesc:
-                desc = STR_UNDOCUMENTED
-            else:
-                desc = self.argDesc[arg.name]
+            desc = arg_desc.get(arg.name, STR_UNDOCUMENTED)
             
-            # Yield an argument object back to the caller
-            yield CmdArg(arg, desc), arg.default
-
-            # If a boolean flag is set to True by default, create a corresponding explicit disable flag
-            if arg.annotation == bool and arg.default == True:
-                yield CmdArg(arg.replace(name = f"no_{arg.name}"), desc), None
+            # Add an argument object (and its default value) to the list
+            cmd_args.append((_get_cmd_arg(command_callable, arg, desc), arg.default))
+        
+        return cmd_args
     
-    def __get_cmd_parser(self, command_callable):
-        # Offset the level from the one passed to the constructor (to skip parsing the previous command)
-        level = self.level + 1
+    def __get_cmd_args(self, parsed_command):
+        command = self.commands[parsed_command]
         
-        # create a parser for the command and a group to track required args
+        # build the argument list for the command only once, then keep it alongside the command
+        if command.cmd_args is None:
+            command.cmd_args = self.__build_cmd_args(command.callable)
+        
+        return command.cmd_args
+    
+    def __get_cmd_parser(self, parsed_command):
+        command_callable = self.commands[parsed_command].callable
+        
+        # create a parser for the command (the usage includes the command itself) and a group to track required args
         parser = argparse.ArgumentParser(
-            description=inspect.getdoc(command_callable),
-            usage=(("%s " * level) + "[<args>]") % tuple(sys.argv[0:level])
+            description=_get_doc(command_callable),
+            usage=f"{self.usage_prefix} {self.argv[self.level]} [<args>]"
         )
         req_args_grp = parser.add_argument_group("required arguments")
         defaults = dict()
         
+        # short options are tracked per parser, so start fresh (the argument list itself is cached per command)
+        self.short_options = set()
+        
         # populate the parser with the arg and type information from the function
-        for arg, default_val in self.__get_arg_properties(command_callable):
+        for arg, default_val in self.__get_cmd_args(parsed_command):
             # determine the long and/or short option names for the argument
-            options = self.__get_options_for_arg(arg.name)
+            options = self.__get_options_for_arg(arg)
             
             # get the argparse-compatible keyword list for the argument
             kwargs = arg.get_argparse_kwargs()
@@ -289,8 +480,9 @@ class MLArgParser:
             # add the argument to the appropriate group
             grp.add_argument(*options, **kwargs)
 
-            # build a list of default args for the parser object
-            if default_val not in (None, inspect._empty):
+            # build a list of default args for the parser object; "append" arguments are left out since argparse
+            # would append the user's values onto the default (the function's own default applies if they're omitted)
+            if default_val is not None and default_val is not _EMPTY and arg.action != "append":
                 defaults[arg.name] = default_val
 
         # set default values